@@ -1,8 +1,34 @@
 #!/usr/bin/env python3
 """Build HC TR Governance Audit"""
 
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from importlib.util import find_spec
 from pathlib import Path
-import pandas as pd
+from typing import TYPE_CHECKING
+
+# pandas, numpy and xlsxwriter are imported where they are used, so --help
+# and the input checks return without paying their import cost
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@dataclass(frozen=True)
+class AuditConfig:
+    source_file: Path
+    source_sheet: str
+    api_column: str
+    data_index_file: Path
+    data_index_column: str
+    output_file: Path
+    output_sheet: str = "Governance Audit"
 
 
 # ================= CONFIG =================
@@ -13,32 +39,70 @@ DATA_INDEX_FILE = Path("DATA INDEX - Attributes.xlsx")
 
 OUTPUT_FILE = Path("HC_TR_Full_Governance_Audit.xlsx")
 OUTPUT_SHEET = "Governance Audit"
+WRITE_CHUNK_ROWS = 10_000
 
 API_COLUMN = "Field Analysis: Field Name"
 DATA_INDEX_COLUMN = "Name"
+
+# Latest parsed + classified audit, keyed on a hash of the inputs and this
+# script. A hit skips the workbook reads and classification only; writing
+# the output workbook still dominates the run.
+CACHE_DIR = Path(".cache")
+
+# Rust-backed reader (python-calamine) when installed; far faster than
+# openpyxl on large sheets. pandas already opens openpyxl read-only.
+READ_ENGINE = "calamine" if find_spec("python_calamine") else "openpyxl"
 # ==========================================
 
+HC_TR_CONFIG = AuditConfig(
+    source_file=SOURCE_FILE,
+    source_sheet=SOURCE_SHEET,
+    api_column=API_COLUMN,
+    data_index_file=DATA_INDEX_FILE,
+    data_index_column=DATA_INDEX_COLUMN,
+    output_file=OUTPUT_FILE,
+    output_sheet=OUTPUT_SHEET,
+)
+
+
+# Classification tokens, compiled once at import and matched against
+# lowercased names, both by the scalar classifiers and by compute_audit
+SENSITIVE_RE = re.compile(r"ssn|bank|routing|tax")
+OPERATIONAL_RE = re.compile(r"resume|employment|cover")
+MARKETING_RE = re.compile(r"status|unit|segment|specialty|vertical")
+SYSTEM_RE = re.compile(r"id|index")
+
+PII_RESTRICTED_RE = re.compile(r"ssn")
+PII_HIGH_RE = re.compile(r"email|phone|address|birth")
+PII_MODERATE_RE = re.compile(r"name")
+
+# Fixed vocabularies of the derived columns, stored as categoricals
+EXISTS_VALUES = ["Y", "N"]
+DATA_CATEGORIES = ["Sensitive", "Operational", "Marketing", "System", "Evaluate"]
+PII_LEVELS = ["Restricted", "High", "Moderate", "None"]
+RECOMMENDED_ACTIONS = ["Remove", "Keep", "Evaluate"]
+
 
 def classify_data_category(field_name: str) -> str:
     value = str(field_name).lower()
-    if any(token in value for token in ("ssn", "bank", "routing", "tax")):
+    if SENSITIVE_RE.search(value):
         return "Sensitive"
-    if any(token in value for token in ("resume", "employment", "cover")):
+    if OPERATIONAL_RE.search(value):
         return "Operational"
-    if any(token in value for token in ("status", "unit", "segment", "specialty", "vertical")):
+    if MARKETING_RE.search(value):
         return "Marketing"
-    if any(token in value for token in ("id", "index")):
+    if SYSTEM_RE.search(value):
         return "System"
     return "Evaluate"
 
 
 def classify_pii_level(field_name: str) -> str:
     value = str(field_name).lower()
-    if "ssn" in value:
+    if PII_RESTRICTED_RE.search(value):
         return "Restricted"
-    if any(token in value for token in ("email", "phone", "address", "birth")):
+    if PII_HIGH_RE.search(value):
         return "High"
-    if "name" in value:
+    if PII_MODERATE_RE.search(value):
         return "Moderate"
     return "None"
 
@@ -53,80 +117,257 @@ def recommended_action(exists: str, category: str) -> str:
     return "Evaluate"
 
 
-def build_governance_audit():
+def normalize_names(names: pd.Series) -> pd.Series:
+    from pandas.api.types import is_string_dtype
 
-    if not SOURCE_FILE.exists():
-        raise FileNotFoundError(f"Missing source file: {SOURCE_FILE}")
+    # Skip the fillna/astype copy when the column already holds only strings
+    if not is_string_dtype(names) or names.hasnans:
+        names = names.fillna("").astype(str)
+    return names.str.strip()
 
-    if not DATA_INDEX_FILE.exists():
-        raise FileNotFoundError(f"Missing Data Index file: {DATA_INDEX_FILE}")
 
-    # Load data
-    source_df = pd.read_excel(SOURCE_FILE, sheet_name=SOURCE_SHEET)
-    data_index_df = pd.read_excel(DATA_INDEX_FILE)
+def audit_cache_key(config: AuditConfig) -> str:
+    # The reader engine is keyed too: calamine and openpyxl can parse the
+    # same cell into different values
+    digest = hashlib.sha256(f"{config!r}|{READ_ENGINE}".encode())
+    # Hashing this script too invalidates the cache when the rules change
+    for path in (config.source_file, config.data_index_file, Path(__file__)):
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
 
-    if API_COLUMN not in source_df.columns:
-        raise KeyError(f"Missing required column in HC sheet: '{API_COLUMN}'")
 
-    if DATA_INDEX_COLUMN not in data_index_df.columns:
-        raise KeyError(f"Missing required column in Data Index: '{DATA_INDEX_COLUMN}'")
+def compute_audit(config: AuditConfig) -> pd.DataFrame:
+    import numpy as np
+    import pandas as pd
 
-    # Normalize Data Index names
-    normalized_index_set = set(
-        data_index_df[DATA_INDEX_COLUMN]
-        .fillna("")
-        .astype(str)
-        .str.strip()
-        .str.lower()
+    # Load data (the two workbooks are independent, so read them concurrently)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        # Every source column is written back out as parsed; the Data Index
+        # only contributes its name column (a callable usecols leaves the
+        # missing-column check below in charge)
+        source_future = executor.submit(
+            pd.read_excel,
+            config.source_file,
+            sheet_name=config.source_sheet,
+            engine=READ_ENGINE,
+        )
+        data_index_future = executor.submit(
+            pd.read_excel,
+            config.data_index_file,
+            engine=READ_ENGINE,
+            usecols=lambda col: col == config.data_index_column,
+            dtype=str,
+        )
+        source_df = source_future.result()
+        data_index_df = data_index_future.result()
+
+    if config.api_column not in source_df.columns:
+        raise KeyError(
+            f"Missing required column in {config.source_sheet}: '{config.api_column}'"
+        )
+
+    if config.data_index_column not in data_index_df.columns:
+        raise KeyError(
+            f"Missing required column in Data Index: '{config.data_index_column}'"
+        )
+
+    # Normalize Data Index names (casefolded for the case-insensitive match,
+    # and unique, so the Index can be probed with get_indexer as a hash lookup)
+    normalized_index_names = pd.Index(
+        normalize_names(data_index_df[config.data_index_column])
+        .str.casefold()
+        .unique()
     )
 
-    # Normalize HC API names
-    normalized_field_names = (
-        source_df[API_COLUMN]
-        .fillna("")
-        .astype(str)
-        .str.strip()
-        .str.lower()
+    # Normalize source API names (case is handled per use below)
+    normalized_field_names = normalize_names(source_df[config.api_column])
+
+    # Field lists repeat names (blank rows above all), so each distinct name
+    # is matched once and the result broadcast back through its code
+    name_codes, distinct_names = normalized_field_names.factorize()
+
+    # Lowercase as Python strings so case mapping matches
+    # classify_data_category / classify_pii_level (pandas' Arrow-backed
+    # .str.lower folds e.g. "İ" differently), then match on the str dtype
+    lowered_names = (
+        pd.Series(distinct_names.astype(object)).str.lower().astype("str")
     )
 
     # Exists in C.IO
-    source_df["Exists in C.IO Data Index (Y/N)"] = normalized_field_names.map(
-        lambda x: "Y" if x in normalized_index_set else "N"
+    exists = np.where(
+        normalized_index_names.get_indexer(distinct_names.str.casefold()) >= 0,
+        "Y",
+        "N",
+    )
+    source_df["Exists in C.IO Data Index (Y/N)"] = pd.Categorical(
+        exists[name_codes], categories=EXISTS_VALUES
     )
 
     # Data Category
-    source_df["Data Category"] = source_df[API_COLUMN].map(classify_data_category)
+    category = np.select(
+        [
+            lowered_names.str.contains(SENSITIVE_RE),
+            lowered_names.str.contains(OPERATIONAL_RE),
+            lowered_names.str.contains(MARKETING_RE),
+            lowered_names.str.contains(SYSTEM_RE),
+        ],
+        ["Sensitive", "Operational", "Marketing", "System"],
+        default="Evaluate",
+    )
+    source_df["Data Category"] = pd.Categorical(
+        category[name_codes], categories=DATA_CATEGORIES
+    )
 
     # PII Level
-    source_df["PII Level"] = source_df[API_COLUMN].map(classify_pii_level)
+    source_df["PII Level"] = pd.Categorical(
+        np.select(
+            [
+                lowered_names.str.contains(PII_RESTRICTED_RE),
+                lowered_names.str.contains(PII_HIGH_RE),
+                lowered_names.str.contains(PII_MODERATE_RE),
+            ],
+            ["Restricted", "High", "Moderate"],
+            default="None",
+        )[name_codes],
+        categories=PII_LEVELS,
+    )
 
     # Recommended Action
-    source_df["Recommended Action"] = source_df.apply(
-        lambda row: recommended_action(
-            row["Exists in C.IO Data Index (Y/N)"],
-            row["Data Category"],
-        ),
-        axis=1,
+    source_df["Recommended Action"] = pd.Categorical(
+        np.select(
+            [exists == "N", category == "Sensitive", category == "Marketing"],
+            ["Remove", "Remove", "Keep"],
+            default="Evaluate",
+        )[name_codes],
+        categories=RECOMMENDED_ACTIONS,
     )
 
-    # Write output
-    with pd.ExcelWriter(OUTPUT_FILE, engine="xlsxwriter") as writer:
-        source_df.to_excel(writer, index=False, sheet_name=OUTPUT_SHEET)
+    return source_df
+
 
-        worksheet = writer.sheets[OUTPUT_SHEET]
+def write_audit(audit_df: pd.DataFrame, config: AuditConfig):
+    import numpy as np
+    import xlsxwriter
+
+    # Write output. constant_memory flushes each row as it is written, which
+    # requires row-major order, so rows are streamed here rather than via
+    # DataFrame.to_excel (that writes column by column).
+    with xlsxwriter.Workbook(
+        config.output_file,
+        {"constant_memory": True, "default_date_format": "yyyy-mm-dd hh:mm:ss"},
+    ) as workbook:
+        worksheet = workbook.add_worksheet(config.output_sheet)
         worksheet.freeze_panes(1, 0)
 
-        # Auto column widths (safe for NaN)
-        for idx, col in enumerate(source_df.columns):
-            column_series = source_df[col].fillna("").astype(str)
-            max_len = max(
-                len(str(col)),
-                column_series.map(len).max()
-            )
+        # Auto column widths (safe for NaN). Cast one column at a time so the
+        # string copy never spans the whole frame.
+        data_widths = audit_df.apply(
+            lambda column: column.fillna("").astype(str).str.len().max()
+        )
+        for idx, (col, data_width) in enumerate(data_widths.items()):
+            max_len = max(len(str(col)), data_width)
             worksheet.set_column(idx, idx, min(max(max_len + 2, 16), 60))
 
-    print(f"HC Governance audit created: {OUTPUT_FILE}")
+        worksheet.write_row(0, 0, audit_df.columns)
+
+        row_idx = 1
+        for start in range(0, len(audit_df), WRITE_CHUNK_ROWS):
+            chunk = audit_df.iloc[start:start + WRITE_CHUNK_ROWS]
+            # Infinities are written as text, like to_excel's default inf_rep,
+            # and missing values become None so xlsxwriter leaves them blank
+            chunk = chunk.replace([np.inf, -np.inf], ["inf", "-inf"])
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            for row in chunk.itertuples(index=False, name=None):
+                worksheet.write_row(row_idx, 0, row)
+                row_idx += 1
+
+
+def read_cached_audit(cache_path: Path) -> pd.DataFrame | None:
+    import pandas as pd
+
+    if not cache_path.exists():
+        return None
+    try:
+        return pd.read_parquet(cache_path)
+    except Exception as exc:
+        # A damaged entry (e.g. left by an older, interrupted run) is a miss
+        cache_path.unlink(missing_ok=True)
+        print(f"Discarding unreadable audit cache: {exc}")
+        return None
+
+
+def write_cached_audit(audit_df: pd.DataFrame, cache_path: Path):
+    # Write next to the final path and rename, so an interrupted run never
+    # leaves a partial entry under the cache key
+    temp_path = None
+    try:
+        CACHE_DIR.mkdir(exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(dir=CACHE_DIR, suffix=".parquet.tmp")
+        os.close(fd)
+        temp_path = Path(temp_name)
+        audit_df.to_parquet(temp_path, index=False)
+        # mkstemp creates the file 0600; give it the usual umask-based mode
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temp_path, 0o666 & ~umask)
+        os.replace(temp_path, cache_path)
+    except (ImportError, TypeError, ValueError):
+        # No parquet engine, or columns pyarrow cannot serialize (e.g. mixed
+        # types): this audit is simply not cached, which is not worth a
+        # message on every run
+        if temp_path is not None:
+            temp_path.unlink(missing_ok=True)
+        return
+    except OSError as exc:
+        if temp_path is not None:
+            temp_path.unlink(missing_ok=True)
+        print(f"Skipping audit cache: {exc}")
+        return
+
+    # Only the latest entry is kept; older keys can never be hit again once
+    # the inputs or this script change
+    for stale_path in CACHE_DIR.glob("*.parquet"):
+        if stale_path != cache_path:
+            stale_path.unlink(missing_ok=True)
+
+
+def build_audit(config: AuditConfig, use_cache: bool = True):
+
+    if not config.source_file.exists():
+        raise FileNotFoundError(f"Missing source file: {config.source_file}")
+
+    if not config.data_index_file.exists():
+        raise FileNotFoundError(f"Missing Data Index file: {config.data_index_file}")
+
+    try:
+        import pandas  # noqa: F401
+        import xlsxwriter  # noqa: F401
+    except ImportError as exc:
+        raise SystemExit(f"Install missing package: {exc.name}") from exc
+
+    cache_path = CACHE_DIR / f"{audit_cache_key(config)}.parquet"
+
+    # Without use_cache the audit is recomputed and the entry overwritten
+    audit_df = read_cached_audit(cache_path) if use_cache else None
+    if audit_df is None:
+        audit_df = compute_audit(config)
+        write_cached_audit(audit_df, cache_path)
+
+    write_audit(audit_df, config)
+
+    print(f"Governance audit created: {config.output_file}")
+
+
+def build_governance_audit(use_cache: bool = True):
+    build_audit(HC_TR_CONFIG, use_cache=use_cache)
 
 
 if __name__ == "__main__":
-    build_governance_audit()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Recompute the audit and refresh its cached result in {CACHE_DIR}/",
+    )
+    args = parser.parse_args()
+    build_governance_audit(use_cache=not args.no_cache)